@@ -1,5 +1,7 @@
+import sys
 import requests
-import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter
+import lxml.etree as ET
 from dataclasses import dataclass
 
 @dataclass
@@ -10,51 +12,131 @@ class BluOSStatus:
     duration: int | None  # seconds
     secs: int | None      # elapsed seconds
     state: str | None     # 'play', 'pause', 'stop'
+    etag: str | None = None  # long-poll token from <status etag="...">
+
+# Candidate tags per field, most preferred first
+# title appears as <name> and also as <title1>; fallbacks included
+_TITLE_TAGS    = ("name", "title1", "title", "song")
+_ARTIST_TAGS   = ("artist", "title2")
+_ALBUM_TAGS    = ("album", "title3")
+_SECS_TAGS     = ("secs", "elapsed", "position", "time")
+_DURATION_TAGS = ("totlen", "duration", "total", "trackLength", "length")
+_STATE_TAGS    = ("state", "status", "mode")
+
+# tag -> (field, priority); lower priority wins when a document carries several fallbacks
+_PRIORITY = {
+    tag: (field, index)
+    for field, tags in (
+        ("title", _TITLE_TAGS),
+        ("artist", _ARTIST_TAGS),
+        ("album", _ALBUM_TAGS),
+        ("secs", _SECS_TAGS),
+        ("duration", _DURATION_TAGS),
+        ("state", _STATE_TAGS),
+    )
+    for index, tag in enumerate(tags)
+}
+_FIELDS = frozenset(field for field, _ in _PRIORITY.values())
+_MISSING = (None, None)
+_VALID_STATES = frozenset(("play", "pause", "stop"))
+
+# Seconds the speaker may hold a long-poll /Status request open waiting for a change
+LONG_POLL_TIMEOUT = 30
 
 class BluOSClient:
     """
     Minimal BluOS client that fetches and parses /Status (XML).
-    Uses recursive lookup + tag fallbacks. Matches your XML: name/title1, artist, album, secs, totlen, state.
+    Uses a single-pass tag harvest (direct children of <status> first) + tag fallbacks. Matches your XML: name/title1, artist, album, secs, totlen, state.
     """
     def __init__(self, host: str, port: int = 11000, timeout: int = 5):
         self.base = f"http://{host}:{port}"
         self.timeout = timeout
-
-    def _findtext_any(self, root: ET.Element, *tags: str):
-        for t in tags:
-            el = root.find(f".//{t}")
-            if el is not None and el.text:
-                return el.text.strip()
-        return None
+        # Keep one connection to the speaker alive across polls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self.session.mount("http://", adapter)
 
     def _to_int(self, s):
-        if s is None: return None
+        if not s: return None
         try:
-            return int(float(s))
+            # BluOS usually sends plain integers; only go through float() when needed
+            if "." in s or "e" in s or "E" in s:
+                return int(float(s))
+            return int(s)
         except Exception:
             return None
 
-    def get_status(self) -> BluOSStatus | None:
+    def _harvest(self, found: dict, el) -> None:
+        """Record el's text into found if it beats the current priority for its field."""
+        tag = el.tag
+        if not isinstance(tag, str) or not el.text:
+            return  # comments / processing instructions, or no text
+        if tag[0] == "{":
+            tag = tag.rpartition("}")[2]  # strip a namespace
+        info = _PRIORITY.get(tag)
+        if info is None:
+            return
+        key, prio = info
+        cur = found.get(key)
+        if cur is None or prio < cur[0]:
+            text = el.text.strip()
+            if text:
+                found[key] = (prio, text)
+
+    def get_status(self, etag: str | None = None) -> BluOSStatus | None:
+        """Fetch /Status. With an etag, long-poll: the speaker answers once state changes or on timeout."""
+        params = None
+        timeout = self.timeout
+        if etag:
+            params = {"etag": etag, "timeout": LONG_POLL_TIMEOUT}
+            timeout = self.timeout + LONG_POLL_TIMEOUT
         try:
-            resp = requests.get(f"{self.base}/Status", timeout=self.timeout)
+            resp = self.session.get(f"{self.base}/Status", params=params, timeout=timeout)
             resp.raise_for_status()
         except Exception:
             return None
 
+        body = resp.content
+        # Empty or plain-text error bodies: don't pay for the parser's exception path
+        # (a UTF-8 BOM may precede valid XML)
+        if not body.removeprefix(b"\xef\xbb\xbf").lstrip().startswith(b"<"):
+            return None
+
         try:
-            root = ET.fromstring(resp.text)
+            try:
+                root = ET.fromstring(body)
+            except ET.XMLSyntaxError:
+                # Malformed document: fall back to a recovering parse
+                root = ET.fromstring(body, ET.XMLParser(recover=True))
+                if root is None:
+                    return None
 
-            # ——— Your device’s fields ———
-            # title appears as <name> and also as <title1>; fallbacks included
-            title  = self._findtext_any(root, "name", "title1", "title", "song")
-            artist = self._findtext_any(root, "artist", "title2")
-            album  = self._findtext_any(root, "album", "title3")
+            # BluOS puts every field directly under <status> (the root itself is
+            # not a state value); deeper matches only fill in fields that no
+            # direct child provided
+            found = {}
+            for el in root:
+                self._harvest(found, el)
+            nested = {}
+            if not _FIELDS.issubset(found):
+                for child in root:
+                    for el in child.iterdescendants():
+                        self._harvest(nested, el)
+            for key, value in nested.items():
+                found.setdefault(key, value)
 
-            secs     = self._findtext_any(root, "secs", "elapsed", "position", "time")
-            duration = self._findtext_any(root, "totlen", "duration", "total", "trackLength", "length")
+            title    = found.get("title", _MISSING)[1]
+            artist   = found.get("artist", _MISSING)[1]
+            album    = found.get("album", _MISSING)[1]
+            secs     = found.get("secs", _MISSING)[1]
+            duration = found.get("duration", _MISSING)[1]
 
-            state = self._findtext_any(root, "state", "status", "mode")
-            state = state.lower() if state else None
+            state = found.get("state", _MISSING)[1]
+            if state:
+                # Interned so main's `state == "play"` checks hit the identity fast path
+                state = sys.intern(state if state in _VALID_STATES else state.lower())
+            else:
+                state = None
 
             return BluOSStatus(
                 title=title,
@@ -63,6 +145,7 @@ class BluOSClient:
                 duration=self._to_int(duration),
                 secs=self._to_int(secs),
                 state=state,
+                etag=root.get("etag"),
             )
         except Exception:
             return None
@@ -50,15 +50,25 @@ class LastFMClient:
             self.network.scrobble(
                 artist=artist, title=title, album=album, duration=duration, timestamp=timestamp
             )
-        except pylast.WSError as e:
-            code = getattr(e, "code", None)
-            msg = str(e)
-            # Map common Last.fm error codes
-            if code in (9, 4, 14):  # 9=Invalid session, 4=Auth failed, 14=Token expired
-                raise LastFMAuthError(msg)
-            elif code in (29,):  # 29=Rate limit exceeded
-                raise LastFMRateLimitError(msg)
-            else:
-                raise LastFMUnknownError(f"Last.fm API error {code}: {msg}")
         except Exception as e:
-            raise LastFMNetworkError(str(e))
+            raise _map_scrobble_error(e)
+
+    def scrobble_many(self, items: list[dict]):
+        """Submit up to 50 scrobbles (dicts of scrobble() kwargs) in a single track.scrobble call."""
+        try:
+            self.network.scrobble_many(items)
+        except Exception as e:
+            raise _map_scrobble_error(e)
+
+def _map_scrobble_error(e: Exception) -> Exception:
+    if isinstance(e, pylast.WSError):
+        code = getattr(e, "code", None)
+        msg = str(e)
+        # Map common Last.fm error codes
+        if code in (9, 4, 14):  # 9=Invalid session, 4=Auth failed, 14=Token expired
+            return LastFMAuthError(msg)
+        elif code in (29,):  # 29=Rate limit exceeded
+            return LastFMRateLimitError(msg)
+        else:
+            return LastFMUnknownError(f"Last.fm API error {code}: {msg}")
+    return LastFMNetworkError(str(e))
@@ -1,7 +1,8 @@
 import os
 import time
 import logging
-from datetime import datetime, timezone
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from bluos import BluOSClient, BluOSStatus
 from lastfm_client import (
@@ -19,6 +20,8 @@ from notifier_gotify import from_env as gotify_notifier_from_env
 BLUOS_HOST = os.getenv("BLUOS_HOST", "127.0.0.1")
 BLUOS_PORT = int(os.getenv("BLUOS_PORT", "11000"))
 POLL_INTERVAL = max(1, int(os.getenv("POLL_INTERVAL", "3")))
+POLL_IDLE = max(POLL_INTERVAL, int(os.getenv("POLL_IDLE", "30")))  # used while not playing
+LONG_POLL_MIN_SPACING = 1  # seconds between long-polls, in case a device answers them immediately
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
 LASTFM_API_KEY = os.getenv("LASTFM_API_KEY")
@@ -29,6 +32,9 @@ LASTFM_PASSWORD_MD5 = os.getenv("LASTFM_PASSWORD_MD5")
 
 SCROBBLE_CACHE_PATH = os.getenv("SCROBBLE_CACHE_PATH", "/data/scrobble_queue.json")
 SCROBBLE_CACHE_LIMIT = int(os.getenv("SCROBBLE_CACHE_LIMIT", "500"))
+SCROBBLE_BATCH = 50    # Last.fm's track.scrobble accepts at most 50 tracks per call
+ALERT_DEDUPE_WINDOW = 60  # seconds during which an identical alert is not re-sent
+NOW_PLAYING_REFRESH = 60  # seconds between repeated Now Playing updates for the same track
 
 # -------------------------
 # Logging setup
@@ -40,6 +46,46 @@ logging.basicConfig(
 )
 log = logging.getLogger("bluos-lastfm")
 
+def _drain(lfm: LastFMClient, queue: ScrobbleQueue, alert) -> int:
+    """Drain cached scrobbles in batches of up to 50; returns how many were submitted.
+
+    Each batch is peeked, submitted, and only then committed (removed) from the
+    queue, so a crash or error mid-submit never loses cached plays. A batch
+    rejected by the API is deferred to the tail instead of retried in place.
+    """
+    drained = 0
+    while True:
+        batch = queue.peek_batch(SCROBBLE_BATCH)
+        if not batch:
+            break
+        try:
+            lfm.scrobble_many(batch)
+        except LastFMAuthError as e:
+            # Stop draining on auth error (user must fix config); the batch stays queued
+            alert("ERROR", "Last.fm auth error while draining",
+                  str(e), {"pending_queue_size": queue.size()})
+            break
+        except (LastFMNetworkError, LastFMRateLimitError) as e:
+            # Transient: leave the batch at the head and stop draining; try later
+            log.info("Draining paused due to error: %s; queue size=%s", e, queue.size())
+            break
+        except LastFMUnknownError as e:
+            # Possibly permanent (e.g. invalid parameters): move the batch to the
+            # tail so it can't block the rest of the cache, and stop for now
+            queue.defer(batch)
+            log.warning("Draining paused; moved %s scrobbles to the back of the queue: %s",
+                        len(batch), e)
+            break
+        queue.commit(batch)
+        drained += len(batch)
+    return drained
+
+def _sleep_until(deadline: float):
+    """Sleep until a time.monotonic() deadline, so poll cadence doesn't drift by the loop's own runtime."""
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
 def main():
     # Validate Last.fm configuration up-front for clear errors
     if not LASTFM_API_KEY or not LASTFM_API_SECRET:
@@ -61,15 +107,48 @@ def main():
     webhook = webhook_notifier_from_env()     # ok if NOTIFY_WEBHOOK_URL is empty
     gotify = gotify_notifier_from_env()       # ok if GOTIFY_URL/TOKEN missing
 
+    # (level, title, message) -> monotonic time it was last sent;
+    # alert() is also called from the background drain, hence the lock
+    last_sent: dict[tuple[str, str, str], float] = {}
+    last_sent_lock = threading.Lock()
+
     def alert(level: str, title: str, message: str, extra: dict | None = None):
+        # Collapse repeats (e.g. the same Last.fm outage error every poll)
+        now = time.monotonic()
+        key = (level, title, message)
+        with last_sent_lock:
+            sent_at = last_sent.get(key)
+            if sent_at is not None and now - sent_at < ALERT_DEDUPE_WINDOW:
+                log.debug("Suppressing duplicate alert: %s", title)
+                return
+            for k in [k for k, t in last_sent.items() if now - t >= ALERT_DEDUPE_WINDOW]:
+                del last_sent[k]
+            last_sent[key] = now
+
         # Fan out to both; each will ignore if not configured or below min_level
         try: webhook.send(level, title, message, extra)
         except Exception: pass
         try: gotify.send(level, title, message, extra)
         except Exception: pass
 
+    # Last.fm calls that the polling loop doesn't need to wait for
+    # (Now Playing updates, queue drains) run here, overlapping the next poll
+    background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lastfm")
+    drain_future: Future | None = None
+
+    def drain_backlog():
+        try:
+            drained = _drain(lfm, queue, alert)
+            if drained:
+                log.info("Drained %s cached scrobbles. Queue size now %s", drained, queue.size())
+        except Exception as e:
+            log.warning("Draining cached scrobbles failed: %s", e)
+
     tracker = PlaybackTracker()
-    log.info("Starting BluOS → Last.fm bridge. Poll interval: %ss", POLL_INTERVAL)
+    # Last Now Playing sent, so an unchanged track isn't re-announced every poll
+    last_np_identity: TrackIdentity | None = None
+    last_np_ts = 0.0
+    log.info("Starting BluOS → Last.fm bridge. Poll interval: %ss (idle: %ss)", POLL_INTERVAL, POLL_IDLE)
     log.info("BluOS device: %s:%s | Cache: %s (limit=%s, size=%s)",
              BLUOS_HOST, BLUOS_PORT, SCROBBLE_CACHE_PATH, SCROBBLE_CACHE_LIMIT, queue.size())
     
@@ -77,12 +156,17 @@ def main():
     alert("INFO", "Bridge started",
           f"Polling {BLUOS_HOST}:{BLUOS_PORT}; cache path {SCROBBLE_CACHE_PATH}.")
 
+    # Long-poll token from the last /Status; None means a plain (immediate) fetch
+    last_etag: str | None = None
+
     while True:
+        tick = time.monotonic()
         try:
-            status: BluOSStatus | None = blu.get_status()
+            status: BluOSStatus | None = blu.get_status(etag=last_etag)
         except Exception as e:
             log.warning("BluOS status fetch failed: %s", e)
-            time.sleep(POLL_INTERVAL)
+            last_etag = None
+            _sleep_until(tick + POLL_INTERVAL)
             continue
 
         if status is not None:
@@ -90,7 +174,8 @@ def main():
                      status.state, status.artist, status.title, status.album, status.secs, status.duration)
         else:
             log.info("Parsed: status=None (unreachable or XML parse failed)")
-            time.sleep(POLL_INTERVAL)
+            last_etag = None
+            _sleep_until(tick + POLL_INTERVAL)
             continue
 
         # Build a stable track identity to avoid duplicate scrobbles
@@ -98,33 +183,35 @@ def main():
             artist=status.artist,
             title=status.title,
             album=status.album,
-            duration=int(status.duration) if status.duration else None,
+            duration=status.duration or None,
         )
 
         tracker.update(identity=identity, state=status.state, elapsed=status.secs)
 
         # Only act when playback is active and we have meaningful metadata
         if status.state == "play" and status.artist and status.title:
-            # 1) Update Now Playing (best-effort)
-            try:
-                lfm.update_now_playing(
+            # 1) Update Now Playing on track change or as a periodic keepalive
+            #    (best-effort, in the background; errors are already logged at
+            #    debug level inside the client)
+            if identity != last_np_identity or tick - last_np_ts > NOW_PLAYING_REFRESH:
+                background.submit(
+                    lfm.update_now_playing,
                     artist=status.artist,
                     title=status.title,
                     album=status.album,
-                    duration=int(status.duration) if status.duration else None,
+                    duration=status.duration or None,
                 )
-            except Exception:
-                # update_now_playing is best-effort; errors already logged at debug level inside client
-                pass
+                last_np_identity = identity
+                last_np_ts = tick
 
             # Prepare the scrobble payload (used whether we scrobble now or enqueue)
-            now = datetime.now(timezone.utc).timestamp()
+            now = time.time()
             started_at = int(now - (status.secs or 0))
             scrobble_payload = dict(
                 artist=status.artist,
                 title=status.title,
                 album=status.album,
-                duration=int(status.duration) if status.duration else None,
+                duration=status.duration or None,
                 timestamp=started_at,
             )
 
@@ -135,25 +222,9 @@ def main():
                     tracker.mark_scrobbled()
                     log.info("Scrobbled: %s — %s%s",
                              status.artist, status.title, f" [{status.album}]" if status.album else "")
-                    # Drain any backlog after a successful scrobble
-                    drained = 0
-                    for pending in queue.drain_iter():
-                        try:
-                            lfm.scrobble(**pending)
-                            drained += 1
-                        except LastFMAuthError as e:
-                            # Stop draining on auth error (user must fix config); re-enqueue the item we just popped
-                            queue.enqueue(pending)
-                            alert("ERROR", "Last.fm auth error while draining",
-                                        str(e), {"pending_queue_size": queue.size()})
-                            break
-                        except (LastFMNetworkError, LastFMRateLimitError, LastFMUnknownError) as e:
-                            # Put it back and stop draining; try later
-                            queue.enqueue(pending)
-                            log.info("Draining paused due to error: %s; queue size=%s", e, queue.size())
-                            break
-                    if drained:
-                        log.info("Drained %s cached scrobbles. Queue size now %s", drained, queue.size())
+                    # Drain any backlog after a successful scrobble, without holding up polling
+                    if queue.size() and (drain_future is None or drain_future.done()):
+                        drain_future = background.submit(drain_backlog)
                 except LastFMAuthError as e:
                     # Auth issue — notify and do NOT cache (user must re-auth)
                     log.error("Scrobble failed (auth): %s", e)
@@ -174,7 +245,17 @@ def main():
         else:
             log.debug("Playback not in 'play' state or missing metadata; skipping.")
 
-        time.sleep(POLL_INTERVAL)
+        # The next long-poll blocks on the speaker until something changes, so it
+        # only needs a short floor; devices that don't hand out an etag are polled
+        # fast while playing and slow while idle
+        last_etag = status.etag
+        if last_etag:
+            # Firmware that ignores etag/timeout (or rotates the etag every time)
+            # would otherwise get back-to-back requests
+            _sleep_until(tick + LONG_POLL_MIN_SPACING)
+        else:
+            sleep_for = POLL_INTERVAL if status.state == "play" else POLL_IDLE
+            _sleep_until(tick + sleep_for)
 
 
 if __name__ == "__main__":
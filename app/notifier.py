@@ -3,14 +3,19 @@ Simple webhook notifier.
 
 - Sends a POST with JSON body to NOTIFY_WEBHOOK_URL.
 - Respects NOTIFY_MIN_LEVEL (e.g., WARNING and above).
-- Non-blocking best-effort: failures are logged but do not crash the app.
+- Non-blocking best-effort: sends run on a small background pool (shared with
+  the Gotify notifier); failures are logged but do not crash the app.
 """
 
 from __future__ import annotations
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import requests
 
+# Background pool for notification POSTs so a slow endpoint never stalls polling
+SEND_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="notify")
+
 _LEVELS = {
     "DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50
 }
@@ -20,6 +25,7 @@ class Notifier:
         self.webhook_url = webhook_url.strip() if webhook_url else None
         self.min_level = _LEVELS.get(min_level.upper(), 30)
         self.app_tag = app_tag
+        self._sess = requests.Session()  # keep-alive to the webhook host
 
     def send(self, level: str, title: str, message: str, extra: dict | None = None):
         if not self.webhook_url:
@@ -34,9 +40,12 @@ class Notifier:
             "message": message,
             "extra": extra or {},
         }
+        SEND_EXECUTOR.submit(self._post, payload)
+
+    def _post(self, payload: dict):
         try:
             # Most webhooks accept JSON; Slack/Discord-compatible webhooks also work.
-            requests.post(self.webhook_url, json=payload, timeout=5)
+            self._sess.post(self.webhook_url, json=payload, timeout=5)
         except Exception as e:
             logging.getLogger("notifier").debug("Notification send failed: %s", e)
 
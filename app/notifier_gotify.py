@@ -13,6 +13,8 @@ import os
 import logging
 import requests
 
+from notifier import SEND_EXECUTOR  # background pool shared with the webhook notifier
+
 _LEVELS = {"DEBUG":10,"INFO":20,"WARNING":30,"ERROR":40,"CRITICAL":50}
 
 class GotifyNotifier:
@@ -22,6 +24,7 @@ class GotifyNotifier:
         self.min_level = _LEVELS.get(min_level.upper(), 30)
         self.default_priority = default_priority
         self.app_tag = app_tag
+        self._sess = requests.Session()  # keep-alive to the Gotify server
 
     def send(self, level: str, title: str, message: str, extra: dict | None = None, priority: int | None = None):
         if not self.url or not self.token:
@@ -35,9 +38,12 @@ class GotifyNotifier:
             "message": message if not extra else f"{message}\n\n{extra}",
             "priority": priority if priority is not None else self.default_priority,
         }
+        SEND_EXECUTOR.submit(self._post, body)
+
+    def _post(self, body: dict):
         headers = {"X-Gotify-Key": self.token}
         try:
-            requests.post(f"{self.url}/message", json=body, headers=headers, timeout=5)
+            self._sess.post(f"{self.url}/message", json=body, headers=headers, timeout=5)
         except Exception as e:
             logging.getLogger("notifier").debug("Gotify send failed: %s", e)
 
@@ -1,9 +1,12 @@
 """
 Persistent, capped scrobble queue.
 
-- Stores pending scrobbles on disk (JSON file), so we don't lose plays on network errors.
+- Stores pending scrobbles on disk, so we don't lose plays on network errors.
+- The file is an append-only JSON-lines log: one line per enqueued item plus small
+  {"_op": "pop"} records, replayed on startup and compacted once it grows
+  well past the live queue. Legacy JSON-array files are migrated on load.
 - Enforces a max length (SCROBBLE_CACHE_LIMIT) to avoid unbounded growth.
-- API is minimal: enqueue(), drain_iter(), size().
+- API is minimal: enqueue(), peek_batch() + commit() / defer(), size().
 """
 
 from __future__ import annotations
@@ -11,7 +14,24 @@ import json
 import os
 import threading
 from collections import deque
-from typing import Deque, Dict, Iterator, Any
+from itertools import islice
+from typing import BinaryIO, Deque, Dict, List, Any
+
+try:
+    import orjson
+
+    def _dumps_line(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+
+    _loads = orjson.loads
+except ImportError:  # fall back to the stdlib encoder
+    def _dumps_line(obj: Any) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+    _loads = json.loads
+
+# Don't bother compacting logs shorter than this many lines
+_COMPACT_MIN_LINES = 100
 
 class ScrobbleQueue:
     def __init__(self, path: str, maxlen: int = 500):
@@ -19,50 +39,137 @@ class ScrobbleQueue:
         self.maxlen = maxlen
         self._lock = threading.Lock()
         self._q: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self._log: BinaryIO | None = None
+        self._lines = 0  # records currently in the log file
         self._load()
 
     # -------- persistence --------
     def _load(self) -> None:
         try:
-            os.makedirs(os.path.dirname(self.path), exist_ok=True)
-            if os.path.isfile(self.path):
-                with open(self.path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        for item in data[-self.maxlen:]:
-                            self._q.append(item)
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            if not os.path.isfile(self.path):
+                return
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            # Replay without a cap (the limit may have changed since the log was
+            # written), then keep only the newest maxlen items
+            replayed: Deque[Dict[str, Any]] = deque()
+            if raw.lstrip().startswith(b"["):
+                # Legacy format: a single JSON array
+                data = _loads(raw)
+                if isinstance(data, list):
+                    replayed.extend(data)
+            else:
+                for line in raw.splitlines():
+                    if not line.strip():
+                        continue
+                    try:
+                        self._replay(replayed, _loads(line))
+                    except ValueError:
+                        # Torn or garbled line (e.g. crash mid-write); skip it
+                        continue
+            self._q.extend(replayed)  # the deque's maxlen trims to the newest items
         except Exception:
-            # Corrupt or unreadable file? Start fresh.
+            # Corrupt or unreadable file? Start fresh; the file is left alone
+            # until the next change rewrites it.
             self._q.clear()
+            return
+        # Start from a compact log holding exactly the live queue
+        try:
+            self._compact()
+        except OSError:
+            # Not writable right now; retried on the next change
+            pass
+
+    @staticmethod
+    def _replay(q: Deque[Dict[str, Any]], record: Any) -> None:
+        if not isinstance(record, dict):
+            return
+        op = record.get("_op")
+        if op is None:
+            q.append(record)
+        elif op == "pop":
+            for _ in range(min(int(record.get("n", 1)), len(q))):
+                q.popleft()
 
-    def _save(self) -> None:
-        # Write atomically to avoid corruption
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self._log is None:
+            # No log open yet (fresh start or unreadable file): write the
+            # whole queue, which already includes this mutation
+            self._compact()
+            return
+        # One short line per mutation instead of rewriting the whole queue
+        self._log.write(_dumps_line(record))
+        self._log.flush()
+        self._lines += 1
+        if self._lines > max(_COMPACT_MIN_LINES, 2 * len(self._q)):
+            self._compact()
+
+    def _compact(self) -> None:
+        # Rewrite the log as one line per live item, atomically to avoid corruption
+        if self._log is not None:
+            self._log.close()
+            self._log = None
         tmp = f"{self.path}.tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(list(self._q), f, ensure_ascii=False)
+        with open(tmp, "wb") as f:
+            f.write(b"".join(_dumps_line(item) for item in self._q))
         os.replace(tmp, self.path)
+        self._log = open(self.path, "ab")
+        self._lines = len(self._q)
 
     # -------- public API --------
     def enqueue(self, item: Dict[str, Any]) -> None:
         with self._lock:
             if len(self._q) == self.maxlen:
-                # Drop oldest when at capacity
+                # Drop oldest when at capacity; logged so replay doesn't depend on the cap
                 self._q.popleft()
+                self._append({"_op": "pop", "n": 1})
             self._q.append(item)
-            self._save()
+            self._append(item)
 
-    def drain_iter(self) -> Iterator[Dict[str, Any]]:
+    def peek_batch(self, n: int) -> List[Dict[str, Any]]:
         """
-        Pops items from the left (oldest-first) one by one,
-        saving after each pop so we don't lose progress.
+        Returns up to n items from the left (oldest-first) without removing
+        them; pass the list to commit() once they've been handled.
         """
-        while True:
-            with self._lock:
-                if not self._q:
-                    return
-                item = self._q.popleft()
-                self._save()
-            yield item
+        with self._lock:
+            return list(islice(self._q, n))
+
+    def commit(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Removes items previously returned by peek_batch() from the head,
+        under one lock and a single pop record. Items the cap already
+        evicted in the meantime are skipped. Returns how many were removed.
+        """
+        with self._lock:
+            n = 0
+            for item in items:
+                if self._q and self._q[0] is item:
+                    self._q.popleft()
+                    n += 1
+            if n:
+                self._append({"_op": "pop", "n": n})
+        return n
+
+    def defer(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Moves items previously returned by peek_batch() from the head to the
+        tail, so a batch that keeps failing doesn't block the rest of the
+        queue. Items the cap already evicted are skipped. Returns how many moved.
+        """
+        with self._lock:
+            moved = []
+            for item in items:
+                if self._q and self._q[0] is item:
+                    moved.append(self._q.popleft())
+            if moved:
+                self._append({"_op": "pop", "n": len(moved)})
+                for item in moved:
+                    self._q.append(item)
+                    self._append(item)
+        return len(moved)
 
     def size(self) -> int:
         with self._lock:
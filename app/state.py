@@ -3,7 +3,7 @@ from dataclasses import dataclass
 # -------------------------
 # Stateless identity for a track
 # -------------------------
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TrackIdentity:
     artist: str | None
     title: str | None